@@ -1,11 +1,22 @@
 #!/usr/bin/env python3
 
-from flask import Flask, jsonify, request, Response, Request
+import orjson
+from flask import Flask, request, Response, Request
 from marshmallow import Schema, fields, validate
 from typing import Callable
+from werkzeug.http import dump_cookie
 
 app = Flask(__name__)
 
+
+def ojsonify(obj, status: int = 200) -> Response:
+    # Faster than flask.jsonify; non-str keys for e.g. marshmallow error dicts
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+    return Response(orjson.dumps(obj, option=option),
+                    status=status,
+                    mimetype="application/json")
+
+
 # Predefined response
 cell_data = [
     {"id": 1, "type": "LTE", "earfcn": "Neuron A"},
@@ -35,107 +46,113 @@ class CellSchema(Base):
     function = fields.Str(required=True, validate=validate.OneOf(["get"]))
     values = fields.List(fields.Nested(CellSchemaValues, required=True), required=True)
 
-## API endpoint functions
-
-def login_schema_func(req: Request) -> Response:
-    # No actual credentials validation, just positive reponse setting cookies
-    positive_response = {
-      "id": "1",
-      "model": "UR75",
-      "pn": "500GL3111111DE0010000000",
-      "oem": "0000",
-      "rtver": "76.2.0.8-r2",
-      "status": 0,
-      "result": [
-        {
-          "ysrole": 4,
-          "ystimeout": 1800,
-          "ysexpires": 1799
-        }
-      ]
+## Static API responses
+
+LOGIN_RESPONSE = {
+  "id": "1",
+  "model": "UR75",
+  "pn": "500GL3111111DE0010000000",
+  "oem": "0000",
+  "rtver": "76.2.0.8-r2",
+  "status": 0,
+  "result": [
+    {
+      "ysrole": 4,
+      "ystimeout": 1800,
+      "ysexpires": 1799
     }
-    resp = jsonify(positive_response)
-    resp.set_cookie('loginname', 'admin', path='/')
-    resp.set_cookie('td', '643c4d02c565beff7a9978162c5f8433', path='/')
-    resp.content_type = "application/json"
-    return resp
+  ]
+}
 
-def cell_schema_func(req: Request) -> Response:
-    positive_response = {
-      "id": 4,
-      "model": "UR75",
-      "pn": "500GL3111111DE0010000000",
-      "oem": "0000",
-      "rtver": "76.2.0.8-r2",
-      "status": 0,
-      "result": [
+CELL_RESPONSE = {
+  "id": 4,
+  "model": "UR75",
+  "pn": "500GL3111111DE0010000000",
+  "oem": "0000",
+  "rtver": "76.2.0.8-r2",
+  "status": 0,
+  "result": [
+    {
+      "get": [
         {
-          "get": [
-            {
-              "type": "yruo_cell_status",
-              "index": 0,
-              "value": {
-                "modem": {
-                  "modem_status": "Ready",
-                  "model": "RM500Q-GL",
-                  "version": "RM500QGLABR11A06M4G",
-                  "cur_sim": "SIM1",
-                  "register": "Registered (Home network)",
-                  "imei": "863305040946682",
-                  "signal": "31asu (-51dBm)",
-                  "imsi": "262011532003967",
-                  "iccid": "89490200001888544924",
-                  "net_provider": "Telekom.de Telekom.de",
-                  "net_type": "LTE",
-                  "plmnid": "26201",
-                  "lac": "521F",
-                  "cellid": "1C17302"
-                },
-                "network": {
-                  "status": "Connected",
-                  "ip": "192.0.0.2",
-                  "netmask": "255.255.255.224",
-                  "gate": "192.0.0.1",
-                  "dns": "0.0.0.0",
-                  "time": "0 days, 01:23:13",
-                  "speed": "RX:     0b, TX:     0b",
-                  "ipv6": "2a01:599:906:9d68:70b0:df30:1aea:6b45/64",
-                  "gatev6": "2a01:599:906:9d68:71f0:a1cb:1c97:cde2",
-                  "dnsv6": "2a01:598:7ff:0:10:74:210:221"
-                },
-                "statistics": {
-                  "sim1": "RX: 0.8 MiB   TX: 14.4 MiB   ALL: 15.2 MiB",
-                  "sim2": "RX: 0.0 MiB   TX: 0.0 MiB   ALL: 0.0 MiB"
-                },
-                "more": {
-                  "cqi": "15",
-                  "dl": "",
-                  "ul": "20 MHz",
-                  "sinr": "25",
-                  "pcid": "140",
-                  "rsrp": "-77dBm",
-                  "rsrq": "-8dB",
-                  "ecgi": "262010115059002",
-                  "earfcn": "1300",
-                  "enodeb": "115059"
-                }
-              }
+          "type": "yruo_cell_status",
+          "index": 0,
+          "value": {
+            "modem": {
+              "modem_status": "Ready",
+              "model": "RM500Q-GL",
+              "version": "RM500QGLABR11A06M4G",
+              "cur_sim": "SIM1",
+              "register": "Registered (Home network)",
+              "imei": "863305040946682",
+              "signal": "31asu (-51dBm)",
+              "imsi": "262011532003967",
+              "iccid": "89490200001888544924",
+              "net_provider": "Telekom.de Telekom.de",
+              "net_type": "LTE",
+              "plmnid": "26201",
+              "lac": "521F",
+              "cellid": "1C17302"
+            },
+            "network": {
+              "status": "Connected",
+              "ip": "192.0.0.2",
+              "netmask": "255.255.255.224",
+              "gate": "192.0.0.1",
+              "dns": "0.0.0.0",
+              "time": "0 days, 01:23:13",
+              "speed": "RX:     0b, TX:     0b",
+              "ipv6": "2a01:599:906:9d68:70b0:df30:1aea:6b45/64",
+              "gatev6": "2a01:599:906:9d68:71f0:a1cb:1c97:cde2",
+              "dnsv6": "2a01:598:7ff:0:10:74:210:221"
+            },
+            "statistics": {
+              "sim1": "RX: 0.8 MiB   TX: 14.4 MiB   ALL: 15.2 MiB",
+              "sim2": "RX: 0.0 MiB   TX: 0.0 MiB   ALL: 0.0 MiB"
+            },
+            "more": {
+              "cqi": "15",
+              "dl": "",
+              "ul": "20 MHz",
+              "sinr": "25",
+              "pcid": "140",
+              "rsrp": "-77dBm",
+              "rsrq": "-8dB",
+              "ecgi": "262010115059002",
+              "earfcn": "1300",
+              "enodeb": "115059"
             }
-          ]
+          }
         }
       ]
     }
-    resp = jsonify(positive_response)
-    resp.set_cookie('loginname', 'admin', path='/')
-    resp.set_cookie('td', '643c4d02c565beff7a9978162c5f8433', path='/')
-    resp.content_type = "application/json"
-    return resp
+  ]
+}
+
+# The responses and cookies never change, so serialize them once at import instead of per request
+LOGIN_RESPONSE_BYTES = orjson.dumps(LOGIN_RESPONSE)
+CELL_RESPONSE_BYTES = orjson.dumps(CELL_RESPONSE)
+RESPONSE_COOKIE_HEADERS = [
+    ('Set-Cookie', dump_cookie('loginname', 'admin', path='/')),
+    ('Set-Cookie', dump_cookie('td', '643c4d02c565beff7a9978162c5f8433', path='/')),
+]
+
+## API endpoint functions
+
+def login_schema_func(req: Request) -> Response:
+    # No actual credentials validation, just positive reponse setting cookies
+    return Response(LOGIN_RESPONSE_BYTES, mimetype="application/json", headers=RESPONSE_COOKIE_HEADERS)
+
+def cell_schema_func(req: Request) -> Response:
+    return Response(CELL_RESPONSE_BYTES, mimetype="application/json", headers=RESPONSE_COOKIE_HEADERS)
 
 ## Map Schema and functions
 
 class SchemaFuncMap:
     def __init__(self, schema: Schema, func: Callable[[Request], Response]):
         self.schema = schema
+        # Bound once so cgi() does not look the method up on every request
+        self.validate = schema.validate
         self.func = func
 
 SCHEMA_FUNC_MAP = {
@@ -143,21 +160,40 @@ SCHEMA_FUNC_MAP = {
     "CellSchema": SchemaFuncMap(CellSchema(), cell_schema_func),
 }
 
+# Pick the schema by the "function" field instead of trying every schema in turn
+FUNCTION_SCHEMA_MAP = {
+    "login": "LoginSchema",
+    "get": "CellSchema",
+}
+
 ## API endpoint
 
+def parse_body(req: Request) -> dict:
+    try:
+        body = orjson.loads(req.get_data(cache=True) or b"{}")
+    except orjson.JSONDecodeError:
+        return {}
+    return body if isinstance(body, dict) else {}
+
 @app.route('/cgi')
 def cgi():
-    all_errors = {}
-    for map_name, map in SCHEMA_FUNC_MAP.items():
-        errors = map.schema.validate(request.json or {})
-        if not errors:
-            return map.func(request)
-        all_errors[map_name] = errors
+    body = parse_body(request)
+    function = body.get("function")
+    map_name = FUNCTION_SCHEMA_MAP.get(function) if isinstance(function, str) else None
+    if map_name is None:
+        errors = {"function": [f"Must be one of: {', '.join(FUNCTION_SCHEMA_MAP)}."]}
+        return ojsonify({ "No schema could be applied": errors }, status=400)
+
+    map = SCHEMA_FUNC_MAP[map_name]
+    errors = map.validate(body)
+    if not errors:
+        return map.func(request)
 
-    return jsonify({ "No schema could be applied": all_errors })
+    return ojsonify({ "No schema could be applied": { map_name: errors } }, status=400)
 
 ## Run server
 
+# For load tests: gunicorn -w 4 -b 127.0.0.1:8080 api_test_milesight:app
 if __name__ == '__main__':
-    app.run(port = 8080, debug=True)
+    app.run(port = 8080)
 
@@ -4,13 +4,19 @@ import os
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Button
 from matplotlib.axes import Axes
+from matplotlib.collections import LineCollection
 from datetime import datetime
 import pandas as pd
 import seaborn as sns
 import argparse
 import numpy as np
-import linecache
-import json
+from numba import njit
+import functools
+import hashlib
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import orjson
 
 # Default Arguments
 DEFAULT_DATASET_PATH = './.logs/rnti_matching_pattern_A.jsonl'
@@ -22,6 +28,8 @@ DEFAULT_RESET_TIMESTAMPS = True
 DEFAULT_FILTER_KEEP_REST = False
 DEFAULT_EXPORT_PATH = './.export/'
 DEFAULT_DIASHOW_KBPS = False
+DEFAULT_CACHE_PATH = './.cache/'
+COUNT_LINES_CHUNK_SIZE = 1 << 20
 
 # RNTI Filterting
 DCI_THRESHOLD = 0
@@ -33,9 +41,26 @@ MIN_TOTAL_UL_FACTOR = 0.005 # x% of the expected UL traffic
 MAX_UL_PER_DCI_THRESHOLD = 5_000_000
 MIN_OCCURENCES_FACTOR = 0.05
 
+# Results of filter_rnti_kernel
+RNTI_KEEP = 0
+RNTI_SKIP_MAX_TOTAL_UL = 1
+RNTI_SKIP_MIN_TOTAL_UL = 2
+RNTI_SKIP_MIN_COUNT = 3
+RNTI_SKIP_MAX_UL_PER_DCI = 4
+RNTI_SKIP_MEDIAN_ZERO = 5
+
+# Bump whenever the cached filtered recordings change their format
+RECORDINGS_CACHE_VERSION = 3
+
 # Plotting
 PLOT_SCATTER_MARKER_SIZE = 10
+PLOT_LINE_COLLECTION_THRESHOLD = 20
 MARKERS = ['o', 's', '^', 'd', 'p', 'h', '*', '>', 'v', '<', 'x']
+# Drop the creation timestamps so vector exports are reproducible
+SAVE_PLOT_METADATA = {
+    'pdf': {'CreationDate': None},
+    'svg': {'Date': None},
+}
 
 sns.set(style="darkgrid")
 
@@ -51,26 +76,105 @@ def print_info(msg: str):
 
 
 def count_lines(file_path: str) -> int:
-    with open(file_path, 'r') as file:
-        return sum(1 for _ in file)
+    nof_lines = 0
+    last_chunk = b''
+    with open(file_path, 'rb') as file:
+        for chunk in iter(functools.partial(file.read, COUNT_LINES_CHUNK_SIZE), b''):
+            nof_lines += chunk.count(b'\n')
+            last_chunk = chunk
+    # Count a trailing line without newline like file iteration does
+    if last_chunk and not last_chunk.endswith(b'\n'):
+        nof_lines += 1
+    return nof_lines
+
+
+class JsonlIndex:
+    """
+    Byte offsets of all lines in a JSONL file, allowing to seek to a single line
+    without reading (and caching) the whole file like linecache does.
+    """
+    def __init__(self, file_path: str):
+        offsets = []
+        offset = 0
+        with open(file_path, 'rb') as file:
+            for line in file:
+                offsets.append(offset)
+                offset += len(line)
+        self.offsets: np.ndarray = np.array(offsets, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_jsonl_index(file_path: str, _file_mtime: float) -> JsonlIndex:
+    return JsonlIndex(file_path)
+
+
+def get_jsonl_index(file_path: str) -> JsonlIndex:
+    # The mtime is part of the cache key, so a modified file gets re-indexed
+    return _cached_jsonl_index(file_path, os.path.getmtime(file_path))
 
 
 def read_single_dataset(file_path: str, line_number: int) -> dict:
     try:
-        return json.loads(linecache.getline(file_path, line_number).strip())
+        index = get_jsonl_index(file_path)
+        if not 1 <= line_number <= len(index):
+            raise IndexError(f"line {line_number} out of range (1..{len(index)})")
+        with open(file_path, 'rb') as file:
+            file.seek(int(index.offsets[line_number - 1]))
+            return dataset_traffic_to_arrays(orjson.loads(file.readline()))
     except Exception as e:
         raise Exception(f"An error occured reading dataset at {file_path}:{line_number}\n{e}")
 
 
-def merge_ue_traffic(dict_a, dict_b):
-    for key, value in dict_b.items():
-        if key in dict_a:
-            dict_a[key]['ul_bytes'] += value['ul_bytes']
-            dict_a[key]['dl_bytes'] += value['dl_bytes']
-        else:
-            dict_a[key] = {'ul_bytes': value['ul_bytes'], 'dl_bytes': value['dl_bytes']}
+def dataset_traffic_to_arrays(raw_dataset: dict) -> dict:
+    """
+    Replace the per DCI traffic dict ({timestamp: {'ul_bytes': ..., 'dl_bytes': ...}}) of every
+    RNTI in the dataset by two parallel arrays: ue_data['timestamps'] (np.int64 epoch in
+    microseconds) and ue_data['ul_bytes'] (np.int32). Corrupt UL bytes beyond the int32 range
+    are clamped to its maximum, which still exceeds MAX_UL_PER_DCI_THRESHOLD, so the filter
+    rejects the RNTI. The DL bytes are not used and get dropped.
+    """
+    for cell_data in raw_dataset.get('cell_traffic', {}).values():
+        for ue_data in cell_data['traffic'].values():
+            traffic = ue_data.pop('traffic')
+            count = len(traffic)
+            ue_data['timestamps'] = np.fromiter(map(int, traffic), dtype=np.int64, count=count)
+            ul_bytes = np.fromiter((tx_data['ul_bytes'] for tx_data in traffic.values()),
+                                   dtype=np.int64,
+                                   count=count)
+            ue_data['ul_bytes'] = np.minimum(ul_bytes, np.iinfo(np.int32).max).astype(np.int32)
+    return raw_dataset
+
+
+def merge_ue_traffic(traffic_a: tuple, traffic_b: tuple) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Merge two UE traffics given as (timestamps, ul_bytes) arrays, summing the UL bytes
+    of timestamps present in both. The merged traffic is sorted by timestamp.
+    """
+    timestamps_a, ul_bytes_a = traffic_a
+    timestamps_b, ul_bytes_b = traffic_b
+
+    timestamps = np.union1d(timestamps_a, timestamps_b)
+    ul_bytes = np.zeros(len(timestamps), dtype=np.result_type(ul_bytes_a, ul_bytes_b))
+    # Timestamps are unique per traffic, so the indexed additions never hit an index twice
+    ul_bytes[np.searchsorted(timestamps, timestamps_a)] += ul_bytes_a
+    ul_bytes[np.searchsorted(timestamps, timestamps_b)] += ul_bytes_b
 
-    return dict_a
+    return timestamps, ul_bytes
+
+
+def ue_traffic_to_arrays(ue_traffic: dict) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Convert UE traffic ({timestamp: {'ul_bytes': ..., ...}}) to sorted timestamps (datetime64[us])
+    and the corresponding UL bytes, sorting the keys only once.
+    """
+    keys = sorted(ue_traffic)
+    count = len(keys)
+    timestamps = np.fromiter((int(ts) for ts in keys), dtype=np.int64, count=count).view('datetime64[us]')
+    ul_bytes = np.fromiter((ue_traffic[ts]['ul_bytes'] for ts in keys), dtype=np.int64, count=count)
+    return timestamps, ul_bytes
 
 
 def move_column_to_front(df: pd.DataFrame, specific_column: str) -> pd.DataFrame:
@@ -84,20 +188,16 @@ def move_column_to_front(df: pd.DataFrame, specific_column: str) -> pd.DataFrame
     Returns:
     - pd.DataFrame: DataFrame with the specified column moved to the front.
     """
-    cols = df.columns.tolist()
-    cols.insert(0, cols.pop(cols.index(specific_column)))
-    cols_df = df[cols]
+    return df.reindex(columns=[specific_column, *df.columns.drop(specific_column)])
 
-    if isinstance(cols_df, pd.DataFrame):
-        return cols_df
 
-    raise Exception("Should not happen, move_column_to_front tried to return something else than a pd.DataFrame")
-
-
-def save_plot(file_path):
-    plt.tight_layout()
-    plt.savefig(file_path)
-    print_debug(f"Saved file: {file_path}")
+def save_plots(base_path, formats=('png', 'pdf', 'svg')):
+    fig = plt.gcf()
+    fig.tight_layout()
+    for ext in formats:
+        file_path = f"{base_path}.{ext}"
+        fig.savefig(file_path, metadata=SAVE_PLOT_METADATA.get(ext))
+        print_debug(f"Saved file: {file_path}")
 
 
 def recording_to_pandas(recording) -> pd.DataFrame:
@@ -123,23 +223,60 @@ def recording_to_pandas(recording) -> pd.DataFrame:
         - Timestamps are assumed to be in epoch time format in microseconds.
         - Actual timestamps are masqueraded
     """
-    flatten_data = {}
-    for ue_traffic, rnti in recording['recordings']:
-        for timestamp, values in ue_traffic.items():
-            converted_timestamp = np.datetime64(int(timestamp), 'us')
-            if converted_timestamp not in flatten_data:
-                flatten_data[converted_timestamp] = {}
-            flatten_data[converted_timestamp][rnti] = values['ul_bytes']
+    all_traffic = recording['recordings']
+    total_count = sum(len(ue_traffic) for ue_traffic, _ in all_traffic)
+    timestamps = np.empty(total_count, dtype=np.int64)
+    rnti_indices = np.empty(total_count, dtype=np.int32)
+    ul_bytes = np.empty(total_count, dtype=np.int64)
+
+    # Fill one flat (timestamp, rnti, ul_bytes) table, one slice per RNTI
+    start = 0
+    for rnti_index, (ue_traffic, _) in enumerate(all_traffic):
+        count = len(ue_traffic)
+        end = start + count
+        timestamps[start:end] = np.fromiter(map(int, ue_traffic), dtype=np.int64, count=count)
+        ul_bytes[start:end] = np.fromiter((values['ul_bytes'] for values in ue_traffic.values()),
+                                          dtype=np.int64,
+                                          count=count)
+        rnti_indices[start:end] = rnti_index
+        start = end
+
+    # Convert all timestamps at once instead of creating a np.datetime64 per timestamp
+    df = pd.DataFrame({
+        'timestamp': timestamps.view('datetime64[us]'),
+        'rnti': rnti_indices,
+        'ul_bytes': ul_bytes,
+    }).pivot(index='timestamp', columns='rnti', values='ul_bytes')
+    df.columns = [all_traffic[rnti_index][1] for rnti_index in df.columns]
+    df = df.rename_axis(index=None).sort_index()
 
-    df = pd.DataFrame.from_dict(flatten_data, orient='index')
-    df.sort_index(inplace=True)
-
-    df.index = pd.to_datetime(df.index)
     # Reset the index to start from 0:00
     df.index = (df.index - df.index[0]).astype('timedelta64[us]')
 
     return df
 
+def rnti_traffic_to_pandas(rnti_traffic: dict, reset_timestamps: bool) -> pd.DataFrame:
+    """
+    Combines the traffic of multiple RNTIs into a DataFrame with timestamps as the index and RNTIs as columns.
+
+    Args:
+        rnti_traffic (dict): { rnti: (timestamps, ul_bytes) } with the epoch timestamps in microseconds
+                             and the UL bytes as parallel arrays.
+        reset_timestamps (bool): Reset the index to start from 0:00.
+
+    Returns:
+        pd.DataFrame: The 'ul_bytes' per timestamp and RNTI, NaN if an RNTI did not send at a timestamp.
+    """
+    all_series = [pd.Series(ul_bytes, index=timestamps.view('datetime64[us]'), name=rnti)
+                  for rnti, (timestamps, ul_bytes) in rnti_traffic.items()]
+    df = pd.concat(all_series, axis=1, sort=True)
+
+    if reset_timestamps:
+        # Reset the index to start from 0:00
+        df.index = (df.index - df.index[0]).astype('timedelta64[us]')
+
+    return df
+
 ##########
 # Diashow
 ##########
@@ -184,6 +321,24 @@ def filter_dataset(settings, raw_dataset) -> FilteredRecording:
 
 
 def filter_dataset_fast(settings, raw_dataset) -> FilteredRecording:
+    result, kept_traffic = filter_rnti_traffic(settings, raw_dataset)
+
+    # Build the DataFrame once from all kept RNTIs instead of once per kept RNTI
+    if kept_traffic:
+        result.filtered_df = rnti_traffic_to_pandas(kept_traffic, settings.reset_timestamps)
+
+    print(f"Nof valid RNTIs: {result.filtered_df.shape[1]}")
+    if result.filtered_df.shape[1] <= 0:
+        raise Exception("No RNTIs left after filtering!!")
+
+    return result
+
+
+def filter_rnti_traffic(settings, raw_dataset) -> tuple[FilteredRecording, dict]:
+    """
+    Apply the RNTI filters to the dataset.
+    Returns the filter statistics and the traffic of the kept RNTIs as { rnti: (timestamps, ul_bytes) }.
+    """
     cell_traffic = raw_dataset['cell_traffic']
     if len(cell_traffic) > 1:
         print(f"!!! More than one cell: {len(cell_traffic)}. Using only the first one.")
@@ -206,60 +361,36 @@ def filter_dataset_fast(settings, raw_dataset) -> FilteredRecording:
     if result.nof_empty_dci > EMPTY_DCI_RATIO_THRESHOLD * result.nof_total_dci:
         raise Exception("nof_empty_dci > EMPTY_DCI_RATIO_THRESHOLD * nof_total_dci")
 
-    for _, cell_data in cell_traffic.items():
-        flattened: dict = {}
-        for rnti, ue_data in cell_data['traffic'].items():
-            if hasattr(settings, 'rnti'):
-                if settings.rnti is not None and rnti != settings.target_rnti:
-                    result.skipped_not_target_rnti += 1
-                    continue
-
-            if ue_data['total_ul_bytes'] > max_total_ul:
-                result.skipped_max_total_ul += 1
-                # print(f"RNTI_UL_THRESHOLD: {ue_data['total_ul_bytes']}")
+    kept_traffic: dict = {}
+    for rnti, ue_data in cell_data['traffic'].items():
+        if hasattr(settings, 'rnti'):
+            if settings.rnti is not None and rnti != settings.rnti:
+                result.skipped_not_target_rnti += 1
                 continue
 
-            if ue_data['total_ul_bytes']  < min_total_ul:
-                result.skipped_min_exp_ul += 1
-                # print(f"MIN_EXPECTED_UL_THRESHOLD: {ue_data['total_ul_bytes']}")
-                continue
-
-            if len(ue_data['traffic']) < min_count:
-                result.skipped_min_count += 1
-                # print(f"MIN_OCCURENCES_THRESHOLD: {len(ue_data['traffic'])}")
-                continue
-
-            skip_rnti = False
-            for _, tx_data in ue_data['traffic'].items():
-                if tx_data['ul_bytes'] > MAX_UL_PER_DCI_THRESHOLD:
-                    result.skipped_max_per_dci_ul += 1
-                    skip_rnti = True
-                    break
-            if skip_rnti:
-                result.skipped_max_per_dci_ul += 1
-                # print("MAX_UL_BYTES_PER_DCI")
-                continue
-
-            if calculate_median(ue_data) <= 0:
-                result.skipped_median_zero += 1
-                continue
-
-            for timestamp, values in ue_data['traffic'].items():
-                converted_timestamp = np.datetime64(int(timestamp), 'us')
-                if converted_timestamp not in flattened:
-                    flattened[converted_timestamp] = {}
-                flattened[converted_timestamp][rnti] = values['ul_bytes']
-
-            all_df = pd.DataFrame.from_dict(flattened, orient='index')
-            all_df.sort_index(inplace=True)
-
-            all_df.index = pd.to_datetime(all_df.index)
-            if settings.reset_timestamps:
-                # Reset the index to start from 0:00
-                all_df.index = (all_df.index - all_df.index[0]).astype('timedelta64[us]')
-
-            result.filtered_df = all_df
-            
+        skip_reason = filter_rnti_kernel(ue_data['ul_bytes'],
+                                         ue_data['total_ul_bytes'],
+                                         min_total_ul,
+                                         max_total_ul,
+                                         min_count,
+                                         MAX_UL_PER_DCI_THRESHOLD)
+        if skip_reason == RNTI_SKIP_MAX_TOTAL_UL:
+            result.skipped_max_total_ul += 1
+            continue
+        elif skip_reason == RNTI_SKIP_MIN_TOTAL_UL:
+            result.skipped_min_exp_ul += 1
+            continue
+        elif skip_reason == RNTI_SKIP_MIN_COUNT:
+            result.skipped_min_count += 1
+            continue
+        elif skip_reason == RNTI_SKIP_MAX_UL_PER_DCI:
+            result.skipped_max_per_dci_ul += 1
+            continue
+        elif skip_reason == RNTI_SKIP_MEDIAN_ZERO:
+            result.skipped_median_zero += 1
+            continue
+
+        kept_traffic[rnti] = (ue_data['timestamps'], ue_data['ul_bytes'])
 
     print("Skipped RNTIs during filtering:")
     print(f"    MAX TOTAL UL: \t {result.skipped_max_total_ul} \t({max_total_ul})")
@@ -270,14 +401,47 @@ def filter_dataset_fast(settings, raw_dataset) -> FilteredRecording:
     if hasattr(settings, 'rnti') and settings.rnti is not None:
         print(f"    TARGET RNTI: \t {result.skipped_not_target_rnti}")
 
-    print(f"Nof valid RNTIs: {result.filtered_df.shape[1]}")
+    return result, kept_traffic
+
+
+# Explicit signature so the kernel is compiled (or loaded from cache) at import
+# and the first diashow click or standardize worker doesn't pay for the JIT
+@njit('i8(i4[:], f8, f8, f8, f8, i8)', cache=True)
+def filter_rnti_kernel(ul_bytes, total_ul_bytes, min_total_ul, max_total_ul, min_count, max_ul_per_dci) -> int:
+    """
+    Apply the per RNTI filter checks to the UL bytes of all its DCIs.
+    Returns RNTI_KEEP or the RNTI_SKIP_* reason of the first failing check.
+    """
+    if total_ul_bytes > max_total_ul:
+        return RNTI_SKIP_MAX_TOTAL_UL
+    if total_ul_bytes < min_total_ul:
+        return RNTI_SKIP_MIN_TOTAL_UL
+    if ul_bytes.size < min_count:
+        return RNTI_SKIP_MIN_COUNT
+    for ul in ul_bytes:
+        if ul > max_ul_per_dci:
+            return RNTI_SKIP_MAX_UL_PER_DCI
+    if ul_bytes.size == 0 or np.median(ul_bytes) <= 0:
+        return RNTI_SKIP_MEDIAN_ZERO
+    return RNTI_KEEP
+
+
+def filter_dataset_slow(settings, raw_dataset) -> FilteredRecording:
+    result, all_traffic = unfiltered_rnti_traffic(raw_dataset)
+    if all_traffic:
+        result.filtered_df = rnti_traffic_to_pandas(all_traffic, settings.reset_timestamps)
+
+    print(f"Nof RNTIs: {result.filtered_df.shape[1]}")
     if result.filtered_df.shape[1] <= 0:
         raise Exception("No RNTIs left after filtering!!")
-    
+
     return result
 
 
-def filter_dataset_slow(settings, raw_dataset) -> FilteredRecording:
+def unfiltered_rnti_traffic(raw_dataset) -> tuple[FilteredRecording, dict]:
+    """
+    Counterpart of filter_rnti_traffic keeping all RNTIs.
+    """
     cell_traffic = raw_dataset['cell_traffic']
     if len(cell_traffic) > 1:
         print(f"!!! More than one cell: {len(cell_traffic)}. Using only the first one.")
@@ -290,30 +454,32 @@ def filter_dataset_slow(settings, raw_dataset) -> FilteredRecording:
     result.expected_ul_bytes = raw_dataset['expected_ul_bytes']
     result.expected_nof_packets = raw_dataset['expected_nof_packets']
 
-    for _, cell_data in cell_traffic.items():
-        flattened: dict = {}
-        for rnti, ue_data in cell_data['traffic'].items():
-            for timestamp, values in ue_data['traffic'].items():
-                converted_timestamp = np.datetime64(int(timestamp), 'us')
-                if converted_timestamp not in flattened:
-                    flattened[converted_timestamp] = {}
-                flattened[converted_timestamp][rnti] = values['ul_bytes']
+    all_traffic = {rnti: (ue_data['timestamps'], ue_data['ul_bytes'])
+                   for rnti, ue_data in cell_data['traffic'].items()}
 
-        all_df = pd.DataFrame.from_dict(flattened, orient='index')
-        all_df.sort_index(inplace=True)
+    return result, all_traffic
 
-        all_df.index = pd.to_datetime(all_df.index)
-        if settings.reset_timestamps:
-            # Reset the index to start from 0:00
-            all_df.index = (all_df.index - all_df.index[0]).astype('timedelta64[us]')
 
-        result.filtered_df = all_df
+def filter_dataset_to_target_arrays(settings, raw_dataset) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Filter the dataset like filter_dataset, but return only the traffic of the target RNTI
+    as (timestamps, ul_bytes) arrays sorted by timestamp, without building a DataFrame.
+    """
+    if settings.filter_keep_rest:
+        _, rnti_traffic = unfiltered_rnti_traffic(raw_dataset)
+    else:
+        _, rnti_traffic = filter_rnti_traffic(settings, raw_dataset)
 
-    print(f"Nof RNTIs: {result.filtered_df.shape[1]}")
-    if result.filtered_df.shape[1] <= 0:
+    if len(rnti_traffic) <= 0:
         raise Exception("No RNTIs left after filtering!!")
 
-    return result
+    rnti = determine_highest_count_rnti(rnti_traffic)
+    timestamps, ul_bytes = rnti_traffic[rnti]
+    order = np.argsort(timestamps, kind='stable')
+
+    print_debug(f"DEBUG [filter_dataset_to_target_arrays] rnti: {rnti} | count: {len(timestamps)}")
+
+    return timestamps[order], ul_bytes[order]
 
 
 def convert_timestamp(timestamp):
@@ -321,23 +487,6 @@ def convert_timestamp(timestamp):
     return dt.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
 
 
-def calculate_median(ue_traffic):
-    numbers = [tx_data['ul_bytes'] for _, tx_data in ue_traffic['traffic'].items()]
-    sorted_list = sorted(numbers)
-    length = len(sorted_list)
-
-    if length % 2 == 0:
-        # If the length is even, return the average of the two middle elements
-        mid1 = sorted_list[length // 2 - 1]
-        mid2 = sorted_list[length // 2]
-        median = (mid1 + mid2) / 2
-    else:
-        # If the length is odd, return the middle element
-        median = sorted_list[length // 2]
-
-    return median
-
-
 def plot_data(ax, dataset, index, settings):
     ax.clear()
     rnti_count = {}
@@ -346,19 +495,16 @@ def plot_data(ax, dataset, index, settings):
     if settings.plot_filtered and len(dataset[index]['removed_by_filter']) > 0:
         ue_traffic = dataset[index]['removed_by_filter']
 
-        timestamps = np.array([np.datetime64(int(ts), 'us') for ts in sorted(list(ue_traffic.keys()))])
-        ul_bytes = [ue_traffic[ts]['ul_bytes'] for ts in sorted(list(ue_traffic.keys()))]
+        timestamps, ul_bytes = ue_traffic_to_arrays(ue_traffic)
 
         ax.scatter(timestamps, ul_bytes, color='grey', alpha=0.2, label='Filtered RNTIs')
 
 
     for ue_traffic, rnti in dataset[index]['recordings']:
         # Extract timestamps and UL bytes
-        timestamps = np.array([np.datetime64(int(ts), 'us') for ts in sorted(list(ue_traffic.keys()))])
+        timestamps, ul_bytes = ue_traffic_to_arrays(ue_traffic)
         all_timestamps.extend(timestamps)
 
-        ul_bytes = [ue_traffic[ts]['ul_bytes'] for ts in sorted(list(ue_traffic.keys()))]
-
         rnti_count[rnti] = len(timestamps)
         # Plot UL bytes for the RNTI
         ax.scatter(timestamps, ul_bytes, label=f'RNTI: {rnti}', s=PLOT_SCATTER_MARKER_SIZE)
@@ -393,17 +539,46 @@ class IndexTracker:
         self.data = data # : list of FilteredRecording
         self.settings = settings
         self.index = 0
+        self.file_mtime = os.path.getmtime(settings.path)
+        # Line plots reuse their Line2D per column slot across datasets instead of clearing the axes
+        self.lines: list = []
+        if self.settings.plot_type == 'line':
+            set_axes_labels(self.ax)
         if self.check_data(self.index):
             self.plot()
 
     def plot(self):
-        self.ax.clear()
         df = self.data[self.index].filtered_df
         print_info(f"Highest DCI count RNTI: {df.count().idxmax()}")
         if self.settings.kbps:
             df = df.resample('1s').sum().mul(8).div(1000)
 
-        plot_df(DEFAULT_DIASHOW_PLOT_TYPE_CHOICES[self.settings.plot_type], df, axes=self.ax)
+        if self.settings.plot_type == 'line':
+            self.update_lines(df)
+        else:
+            self.ax.clear()
+            plot_df(DEFAULT_DIASHOW_PLOT_TYPE_CHOICES[self.settings.plot_type], df, axes=self.ax)
+
+    def update_lines(self, df: pd.DataFrame):
+        # Drop the slots the current dataset doesn't fill
+        for line in self.lines[len(df.columns):]:
+            line.remove()
+        del self.lines[len(df.columns):]
+
+        x_values = df.index.total_seconds().values
+        colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+        for i, column in enumerate(df.columns):
+            if i == len(self.lines):
+                # Fixed colour per slot, like a freshly cleared axes would assign
+                line, = self.ax.plot([], [], marker=MARKERS[i % len(MARKERS)], color=colors[i % len(colors)])
+                self.lines.append(line)
+            self.lines[i].set_data(x_values, df[column].values)
+            self.lines[i].set_label(column)
+
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.ax.legend(fontsize=18)
+        self.ax.figure.canvas.draw_idle()
 
     def check_data(self, file_index) -> bool:
         if isinstance(self.data[file_index], FilteredRecording):
@@ -422,16 +597,25 @@ class IndexTracker:
 
         return False
 
+    def refresh_data(self):
+        # Only recount the dataset lines if the file changed since the last check
+        file_mtime = os.path.getmtime(self.settings.path)
+        if file_mtime == self.file_mtime:
+            return
+        self.file_mtime = file_mtime
+
+        nof_lines = count_lines(self.settings.path)
+        if nof_lines != len(self.data):
+            self.data = [None for _ in range(nof_lines)]
+
     def next(self, _):
-        if count_lines(self.settings.path) != len(self.data):
-            self.data = [None for _ in range(count_lines(self.settings.path))]
+        self.refresh_data()
         self.index = (self.index + 1) % len(self.data)
         if self.check_data(self.index):
             self.plot()
 
     def prev(self, _):
-        if count_lines(self.settings.path) != len(self.data):
-            self.data = [None for _ in range(count_lines(self.settings.path))]
+        self.refresh_data()
         self.index = (self.index - 1) % len(self.data)
         if self.check_data(self.index):
             self.plot()
@@ -444,22 +628,12 @@ class IndexTracker:
 def standardize(settings):
     all_recordings = read_all_recordings(settings)
     print(f"DEBUG len(all_data) {len(all_recordings)}")
-    ul_timeline_matrix = np.zeros((len(all_recordings), 3))
-    dci_time_deltas_matrix = np.zeros((len(all_recordings), 3))
-    count_vec = np.zeros((len(all_recordings), 1))
-    total_ul_vec = np.zeros((len(all_recordings), 1))
-    for (index, recordings) in enumerate(all_recordings):
-        (ul_timeline, dci_time_deltas, count, total_ul_bytes) = determine_highest_count_ul_timeline(recordings)
-        count_vec[index] = count
-        total_ul_vec[index] = total_ul_bytes
-
-        ul_timeline_matrix[index, 0] = np.median(ul_timeline)
-        ul_timeline_matrix[index, 1] = np.mean(ul_timeline)
-        ul_timeline_matrix[index, 2] = np.var(ul_timeline)
-
-        dci_time_deltas_matrix[index, 0] = np.median(dci_time_deltas)
-        dci_time_deltas_matrix[index, 1] = np.mean(dci_time_deltas)
-        dci_time_deltas_matrix[index, 2] = np.var(dci_time_deltas)
+    timelines = [determine_highest_count_ul_timeline(target_traffic) for target_traffic in all_recordings]
+    count_vec = np.array([count for (_, _, count, _) in timelines], dtype=np.float64)
+    total_ul_vec = np.array([total_ul_bytes for (_, _, _, total_ul_bytes) in timelines], dtype=np.float64)
+
+    ul_timeline_matrix = per_recording_statistics([ul_timeline for (ul_timeline, _, _, _) in timelines])
+    dci_time_deltas_matrix = per_recording_statistics([dci_time_deltas for (_, dci_time_deltas, _, _) in timelines])
 
     std_count = (np.mean(count_vec), np.std(count_vec))
     std_total_ul = (np.mean(total_ul_vec), np.std(total_ul_vec))
@@ -507,35 +681,107 @@ def standardize(settings):
     print("],")
 
 
+def per_recording_statistics(all_values: list) -> np.ndarray:
+    """
+    Median, mean and variance of each recording's values as the rows of a (len(all_values), 3) matrix,
+    computed in a single groupby over all recordings instead of three NumPy calls per recording.
+    """
+    if len(all_values) == 0:
+        return np.zeros((0, 3))
+
+    recording_ids = np.repeat(np.arange(len(all_values)), [len(values) for values in all_values])
+    grouped = pd.Series(np.concatenate(all_values).astype(np.float64)).groupby(recording_ids)
+    statistics = pd.concat([grouped.median(), grouped.mean(), grouped.var(ddof=0)], axis=1)
+    # Recordings without values have no group, their statistics are NaN like with np.median([])
+    return statistics.reindex(range(len(all_values))).to_numpy()
+
+
+def read_recording(settings, line_number: int):
+    raw_data = read_single_dataset(settings.path, line_number)
+    try:
+        return filter_dataset_to_target_arrays(settings, raw_data)
+    except:
+        pass
+
+    return None
+
+
+def recordings_cache_file(settings) -> str:
+    # Any change of the dataset file or the filter parameters results in a new cache file
+    cache_key = ":".join(str(part) for part in [
+        RECORDINGS_CACHE_VERSION,
+        os.path.abspath(settings.path),
+        os.path.getmtime(settings.path),
+        settings.reset_timestamps,
+        settings.filter_keep_rest,
+        DCI_THRESHOLD,
+        EMPTY_DCI_RATIO_THRESHOLD,
+        MAX_TOTAL_UL_FACTOR,
+        MIN_TOTAL_UL_FACTOR,
+        MAX_UL_PER_DCI_THRESHOLD,
+        MIN_OCCURENCES_FACTOR,
+    ])
+    cache_hash = hashlib.blake2b(cache_key.encode(), digest_size=8).hexdigest()
+    return os.path.join(settings.cache_path, f"recordings_{cache_hash}.pkl")
+
+
 def read_all_recordings(settings):
-    all_runs = []
-    for line_number in range(1, count_lines(settings.path)):
-        raw_data = read_single_dataset(settings.path, line_number)
+    cache_file = None
+    if hasattr(settings, 'cache_path') and settings.cache_path:
+        cache_file = recordings_cache_file(settings)
+        if os.path.isfile(cache_file):
+            print_info(f"Reading filtered recordings from cache: {cache_file}")
+            try:
+                with open(cache_file, 'rb') as file:
+                    return pickle.load(file)
+            except (EOFError, pickle.UnpicklingError) as e:
+                print_info(f"Ignoring unreadable cache file: {e}")
+
+    # Build the line index up front, so forked workers inherit it instead of rescanning the file.
+    # With the spawn start method (macOS, Windows) each worker still builds its own index.
+    get_jsonl_index(settings.path)
+
+    # The recordings are independent of each other, so parse and filter them in parallel.
+    # Hand out the lines in chunks to avoid one IPC round trip per recording.
+    line_numbers = range(1, count_lines(settings.path))
+    chunksize = max(1, len(line_numbers) // (4 * (os.cpu_count() or 1)))
+    with ProcessPoolExecutor() as executor:
+        all_runs = executor.map(functools.partial(read_recording, settings),
+                                line_numbers,
+                                chunksize=chunksize)
+        all_runs = [run for run in all_runs if run is not None]
+
+    if cache_file is not None:
+        os.makedirs(settings.cache_path, exist_ok=True)
+        # Write to a temporary file first, so an interrupted dump never leaves a truncated cache
+        fd, tmp_file = tempfile.mkstemp(dir=settings.cache_path, suffix='.tmp')
         try:
-            result = filter_dataset(settings, raw_data)
-            if result is not None:
-                all_runs.append(result.filtered_df)
-        except:
-            pass
+            with os.fdopen(fd, 'wb') as file:
+                pickle.dump(all_runs, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        except BaseException:
+            os.remove(tmp_file)
+            raise
+        print_info(f"Cached filtered recordings: {cache_file}")
 
     return all_runs
 
 
-def determine_highest_count_ul_timeline(df):
+def determine_highest_count_rnti(rnti_traffic: dict) -> str:
     rnti = "11852"
-    target_traffic: pd.DataFrame = pd.DataFrame()
+    if not rnti in rnti_traffic:
+        rnti = max(rnti_traffic, key=lambda rnti: len(rnti_traffic[rnti][0]))
+    return rnti
 
-    if not rnti in df.columns:
-        rnti = df.count().idxmax()
-    target_traffic = df[rnti].dropna()
 
-    ul_timeline = target_traffic.values
-    count = target_traffic.count()
-    total_ul_bytes = target_traffic.sum()
-    index_numpy = target_traffic.index.to_numpy()
-    dci_time_deltas = (index_numpy[1:] - index_numpy[:-1]).astype(int)
+def determine_highest_count_ul_timeline(target_traffic):
+    timestamps, ul_bytes = target_traffic
 
-    print_debug(f"DEBUG [determine_highest_count_ul_timeline] rnti: {rnti} | count: {count}")
+    ul_timeline = ul_bytes
+    count = len(ul_bytes)
+    total_ul_bytes = ul_bytes.sum()
+    # Timestamps are in microseconds
+    dci_time_deltas = np.diff(timestamps)
 
     return (ul_timeline, dci_time_deltas, count, total_ul_bytes)
 
@@ -568,9 +814,7 @@ def export(settings):
     plot_df(plot_pandas_line, df_kbps)
     xlim = plt.xlim()
     ylim = plt.ylim()
-    save_plot(export_base_path + "_filtered.png")
-    save_plot(export_base_path + "_filtered.pdf")
-    save_plot(export_base_path + "_filtered.svg")
+    save_plots(export_base_path + "_filtered")
     plt.close()
 
     ###
@@ -581,9 +825,7 @@ def export(settings):
     plot_df(plot_pandas_line, df_single_rnti)
     plt.xlim(xlim)
     plt.ylim(ylim)
-    save_plot(export_base_path + "_single.png")
-    save_plot(export_base_path + "_single.pdf")
-    save_plot(export_base_path + "_single.svg")
+    save_plots(export_base_path + "_single")
     plt.close()
 
     ###
@@ -597,12 +839,10 @@ def export(settings):
     print_info( "  [x] Reading the whole dataset without filtering..")
 
     print_info(f"  [ ] Plotting unfiltered {df_all_kbps.shape[0]}x{df_all_kbps.shape[1]}..")
-    plot_df(plot_pandas_line, df_all_kbps, legend=False)
+    plot_df(plot_pandas_line_nolegend, df_all_kbps, legend=False)
     print_info(f"  [x] Plotting unfiltered {df_all_kbps.shape[0]}x{df_all_kbps.shape[1]}..")
 
-    save_plot(export_base_path + "_unfiltered.png")
-    save_plot(export_base_path + "_unfiltered.pdf")
-    save_plot(export_base_path + "_unfiltered.svg")
+    save_plots(export_base_path + "_unfiltered")
     plt.show()
     plt.close()
 
@@ -619,6 +859,15 @@ def export(settings):
     # plot_basic_filtered(settings, filtered_recording)
 
 
+def set_axes_labels(ax: Axes):
+    # ax.set_title('Scatter Plot of UL Bytes over Time')
+    # ax.tick_params(axis='x', rotation=45)
+    ax.set_xlabel('Timestamp (seconds)', fontsize=28)
+    ax.set_ylabel('UL Traffic (kbit/s)', fontsize=28)
+    ax.tick_params(axis='x', labelsize=24)
+    ax.tick_params(axis='y', labelsize=24)
+
+
 def plot_df(func, df: pd.DataFrame, axes=None, legend=True):
     ax: Axes = axes
 
@@ -626,13 +875,7 @@ def plot_df(func, df: pd.DataFrame, axes=None, legend=True):
         _, ax = plt.subplots()
 
     func(ax, df)
-
-    # ax.set_title('Scatter Plot of UL Bytes over Time')
-    # ax.tick_params(axis='x', rotation=45)
-    ax.set_xlabel('Timestamp (seconds)', fontsize=28)
-    ax.set_ylabel('UL Traffic (kbit/s)', fontsize=28)
-    ax.tick_params(axis='x', labelsize=24)
-    ax.tick_params(axis='y', labelsize=24)
+    set_axes_labels(ax)
 
     if legend:
         ax.legend(fontsize=18)
@@ -644,8 +887,11 @@ def plot_df(func, df: pd.DataFrame, axes=None, legend=True):
 
 
 def plot_pandas_scatter(ax, df: pd.DataFrame):
+    # Convert the index and extract the values once instead of per column
+    x_values = df.index.total_seconds().values
+    y_values = df.to_numpy()
     for i, column in enumerate(df.columns):
-        ax.scatter(df.index.total_seconds(), df[column], label=column, marker=MARKERS[i % len(MARKERS)], s=PLOT_SCATTER_MARKER_SIZE)
+        ax.scatter(x_values, y_values[:, i], label=column, marker=MARKERS[i % len(MARKERS)], s=PLOT_SCATTER_MARKER_SIZE)
 
 
 
@@ -656,12 +902,38 @@ def plot_pandas_line(ax, df):
         ax.plot(x_values, y_values, marker=MARKERS[i % len(MARKERS)], label=column)
 
 
+def plot_pandas_line_nolegend(ax, df):
+    """
+    Like plot_pandas_line, but for plots without legend: wide frames are drawn as one
+    unlabelled LineCollection plus one scatter for the markers instead of one Line2D per column.
+    The markers matter, most cells of a wide frame sit between NaNs and draw no line segment.
+    """
+    if len(df.columns) <= PLOT_LINE_COLLECTION_THRESHOLD:
+        plot_pandas_line(ax, df)
+        return
+
+    x_values = df.index.total_seconds().values
+    y_values = df.to_numpy(dtype=np.float64)
+    colors = plt.cm.tab20(np.arange(len(df.columns)) % 20)
+    segments = [np.column_stack([x_values, y_values[:, i]]) for i in range(y_values.shape[1])]
+    ax.add_collection(LineCollection(segments, colors=colors))
+
+    row_indices, column_indices = np.nonzero(~np.isnan(y_values))
+    ax.scatter(x_values[row_indices],
+               y_values[row_indices, column_indices],
+               c=colors[column_indices],
+               s=plt.rcParams['lines.markersize'] ** 2)
+    ax.autoscale()
+
+
 def log_bins(data):
     return np.logspace(np.log10(20), np.log10(data.max()), num=50)
 
 
 def plot_pandas_hist_log(ax, df, bin_func=log_bins):
-    all_ul_bytes = df.stack().values
+    # Flat view of all cells, cheaper than stack() which builds a MultiIndex
+    all_ul_bytes = df.to_numpy(dtype=np.float64).ravel()
+    all_ul_bytes = all_ul_bytes[~np.isnan(all_ul_bytes)]
     bins = bin_func(all_ul_bytes)
 
     # Create logarithmic bins
@@ -695,19 +967,16 @@ def plot_basic_filtered(settings, recording):
     if settings.plot_filtered and len(recording['removed_by_filter']) > 0:
         ue_traffic = recording['removed_by_filter']
 
-        timestamps = np.array([np.datetime64(int(ts), 'us') for ts in sorted(list(ue_traffic.keys()))])
-        ul_bytes = [ue_traffic[ts]['ul_bytes'] for ts in sorted(list(ue_traffic.keys()))]
+        timestamps, ul_bytes = ue_traffic_to_arrays(ue_traffic)
 
         ax.scatter(timestamps, ul_bytes, color='grey', alpha=0.2, label='Filtered RNTIs')
 
 
     for ue_traffic, rnti in recording['recordings']:
         # Extract timestamps and UL bytes
-        timestamps = np.array([np.datetime64(int(ts), 'us') for ts in sorted(list(ue_traffic.keys()))])
+        timestamps, ul_bytes = ue_traffic_to_arrays(ue_traffic)
         all_timestamps.extend(timestamps)
 
-        ul_bytes = [ue_traffic[ts]['ul_bytes'] for ts in sorted(list(ue_traffic.keys()))]
-
         rnti_count[rnti] = len(timestamps)
         # Plot UL bytes for the RNTI
         ax.scatter(timestamps, ul_bytes, label=f'RNTI: {rnti}', s=PLOT_SCATTER_MARKER_SIZE)
@@ -781,6 +1050,10 @@ if __name__ == "__main__":
 
     # standardize subcommand
     parser_standardize = subparsers.add_parser('standardize', help='Run standardize mode')
+    parser_standardize.add_argument('--cache-path',
+                                    type=str,
+                                    default=DEFAULT_CACHE_PATH,
+                                    help=f'Directory to cache the filtered recordings in, empty to disable (default: {DEFAULT_CACHE_PATH})')
 
     # export subcommand
     parser_export = subparsers.add_parser('export', help='Run export mode')